@@ -1,7 +1,16 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
-from prompts import MESSAGE_DRAFTING_PROMPT
+from prompts import (
+    MESSAGE_DRAFTING_PROMPT, FALLBACK_GREETINGS, FALLBACK_BIRTHDAY_TODAY,
+    FALLBACK_BIRTHDAY_BELATED, FALLBACK_BIRTHDAY_UPCOMING, FALLBACK_LONG_TIME,
+    FALLBACK_CHECK_IN, FALLBACK_CLOSING
+)
 
 # Load environment variables
 load_dotenv()
@@ -10,23 +19,240 @@ load_dotenv()
 genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
 model = genai.GenerativeModel('gemini-pro')
 
-def draft_message(contact_info, custom_prompt=""):
-    """Draft a personalized message using Gemini AI"""
+# Latency budget and circuit breaker configuration
+AI_TIMEOUT_SECONDS = float(os.getenv('AI_TIMEOUT_SECONDS', 5))
+AI_FAILURE_THRESHOLD = int(os.getenv('AI_FAILURE_THRESHOLD', 3))
+AI_COOLDOWN_SECONDS = float(os.getenv('AI_COOLDOWN_SECONDS', 60))
+
+# Model calls run in worker threads so a slow request can be abandoned.
+# A running call cannot be cancelled, so at most AI_MAX_WORKERS threads can be
+# left waiting on hung Gemini requests; while all of them are busy, drafts use
+# the local template instead of queueing behind them.
+AI_MAX_WORKERS = 4
+executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS)
+
+# Errors that mean Gemini is unreachable or failing, as opposed to problems
+# with a single prompt or reply
+MODEL_UNAVAILABLE_ERRORS = (google_exceptions.GoogleAPIError, ConnectionError)
+
+# Circuit breaker state: consecutive failures, when the circuit opened,
+# whether a trial call is running and how many workers are busy
+circuit = {"failures": 0, "opened_at": None, "trial": False, "busy_workers": 0}
+circuit_lock = threading.Lock()
+
+# Recent draft latencies in seconds, for reporting
+draft_latencies = []
+MAX_LATENCY_SAMPLES = 1000
+
+def acquire_model_call():
+    """Reserve a worker for a model call, or return False to draft locally"""
+    with circuit_lock:
+        # All workers are stuck on earlier calls; skip without counting a failure
+        if circuit["busy_workers"] >= AI_MAX_WORKERS:
+            return False
+        
+        # While open, allow a single trial call once the cooldown has passed
+        if circuit["opened_at"] is not None:
+            if circuit["trial"] or time.monotonic() - circuit["opened_at"] < AI_COOLDOWN_SECONDS:
+                return False
+            circuit["trial"] = True
+        
+        circuit["busy_workers"] += 1
+        return True
+
+def release_worker(future):
+    """Free the worker reserved by acquire_model_call"""
+    with circuit_lock:
+        circuit["busy_workers"] -= 1
+
+def record_success():
+    """Close the circuit after a model call that reached Gemini"""
+    with circuit_lock:
+        circuit["failures"] = 0
+        circuit["opened_at"] = None
+        circuit["trial"] = False
+
+def record_failure():
+    """Count a failed model call and open the circuit once the threshold is hit"""
+    with circuit_lock:
+        circuit["failures"] += 1
+        circuit["trial"] = False
+        if circuit["failures"] >= AI_FAILURE_THRESHOLD:
+            circuit["opened_at"] = time.monotonic()
+
+def release_trial():
+    """End a trial call that failed for reasons unrelated to Gemini's availability"""
+    with circuit_lock:
+        circuit["trial"] = False
+
+def record_latency(seconds):
+    """Store a draft latency sample"""
+    with circuit_lock:
+        draft_latencies.append(seconds)
+        if len(draft_latencies) > MAX_LATENCY_SAMPLES:
+            del draft_latencies[0]
+
+def get_draft_stats():
+    """Get p50/p99 draft latency and circuit breaker state"""
+    with circuit_lock:
+        samples = sorted(draft_latencies)
+        circuit_state = dict(circuit)
+    
+    def percentile(p):
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return round(samples[index] * 1000, 1)
+    
+    return {
+        "samples": len(samples),
+        "p50_ms": percentile(50),
+        "p99_ms": percentile(99),
+        "circuit_open": circuit_state["opened_at"] is not None,
+        "consecutive_failures": circuit_state["failures"],
+        "busy_workers": circuit_state["busy_workers"]
+    }
+
+def get_days_until_birthday(birthday_date, today):
+    """Get the offset in days to the nearest birthday, negative if it just passed"""
+    offsets = []
+    
+    # Look at last, this and next year so the window works across New Year
+    for year in (today.year - 1, today.year, today.year + 1):
+        try:
+            occurrence = birthday_date.replace(year=year)
+        except ValueError:
+            # Feb 29 birthday in a non-leap year
+            occurrence = birthday_date.replace(year=year, day=28)
+        offsets.append((occurrence - today).days)
+    
+    return min(offsets, key=abs)
+
+def draft_local_message(contact_info):
+    """Draft a message from templates using the same contact fields as the AI prompt.
+    Notes are private to the user, so unlike the AI prompt they are never quoted."""
+    name = (contact_info.get('name') or '').strip() or 'Friend'
+    birthday = contact_info.get('birthday')
+    last_contact = contact_info.get('last_contact_date')
+    contact_group = contact_info.get('contact_group') or 'friends'
+    today = datetime.now().date()
+    
+    parts = [FALLBACK_GREETINGS.get(contact_group, FALLBACK_GREETINGS['friends']).format(name=name.split()[0])]
+    
+    # Birthday today, within the last 3 days, or within the next week
+    birthday_line = None
+    if birthday:
+        try:
+            days_until_birthday = get_days_until_birthday(datetime.strptime(birthday, '%Y-%m-%d').date(), today)
+            if days_until_birthday == 0:
+                birthday_line = FALLBACK_BIRTHDAY_TODAY
+            elif -3 <= days_until_birthday < 0:
+                birthday_line = FALLBACK_BIRTHDAY_BELATED
+            elif 0 < days_until_birthday <= 7:
+                birthday_line = FALLBACK_BIRTHDAY_UPCOMING
+        except ValueError:
+            # Invalid birthday format, skip birthday line
+            pass
+    
+    if birthday_line:
+        parts.append(birthday_line)
+    else:
+        days_since = None
+        if last_contact:
+            try:
+                days_since = (today - datetime.strptime(last_contact, '%Y-%m-%d').date()).days
+            except ValueError:
+                pass
+        parts.append(FALLBACK_LONG_TIME if days_since is None or days_since >= 30 else FALLBACK_CHECK_IN)
+    
+    parts.append(FALLBACK_CLOSING)
+    return " ".join(parts)
+
+def draft_ai_message(contact_info, custom_prompt=""):
+    """Draft a message with Gemini within the latency budget, or return None"""
+    # Format the prompt with contact info
+    prompt = MESSAGE_DRAFTING_PROMPT.format(
+        name=contact_info.get('name', 'Friend'),
+        birthday=contact_info.get('birthday', 'Not specified'),
+        notes=contact_info.get('notes', 'No notes'),
+        last_contact_date=contact_info.get('last_contact_date', 'Unknown'),
+        contact_group=contact_info.get('contact_group', 'friends'),
+        custom_prompt=f"\nAdditional context: {custom_prompt}" if custom_prompt else ""
+    )
+    
+    # Generate the message within the latency budget. The pinned
+    # google-generativeai 0.3.0 has no per-request timeout, so a call
+    # that times out keeps its worker until Gemini answers.
+    future = executor.submit(model.generate_content, prompt)
+    future.add_done_callback(release_worker)
+    
     try:
-        # Format the prompt with contact info
-        prompt = MESSAGE_DRAFTING_PROMPT.format(
-            name=contact_info.get('name', 'Friend'),
-            birthday=contact_info.get('birthday', 'Not specified'),
-            notes=contact_info.get('notes', 'No notes'),
-            last_contact_date=contact_info.get('last_contact_date', 'Unknown'),
-            contact_group=contact_info.get('contact_group', 'friends'),
-            custom_prompt=f"\nAdditional context: {custom_prompt}" if custom_prompt else ""
-        )
+        response = future.result(timeout=AI_TIMEOUT_SECONDS)
         
-        # Generate the message
-        response = model.generate_content(prompt)
-        return response.text.strip()
+    except FutureTimeoutError:
+        print(f"Drafting message timed out after {AI_TIMEOUT_SECONDS}s, using local draft")
+        record_failure()
+        return None
+        
+    except MODEL_UNAVAILABLE_ERRORS as e:
+        print(f"Failed to draft message: {e}, using local draft")
+        record_failure()
+        return None
         
     except Exception as e:
-        print(f"Failed to draft message: {e}")
-        return "Sorry, I couldn't generate a message right now. Please try again later."
+        # A bad request says nothing about Gemini's availability
+        print(f"Failed to draft message: {e}, using local draft")
+        release_trial()
+        return None
+    
+    record_success()
+    
+    try:
+        return response.text.strip()
+    except ValueError as e:
+        # Gemini answered but returned no text, e.g. a safety-blocked reply
+        print(f"Gemini returned no message: {e}, using local draft")
+        return None
+
+def draft_message(contact_info, custom_prompt=""):
+    """Draft a personalized message using Gemini AI, falling back to a local template"""
+    start = time.monotonic()
+    
+    message = None
+    if acquire_model_call():
+        message = draft_ai_message(contact_info, custom_prompt)
+    if message is None:
+        message = draft_local_message(contact_info)
+    
+    record_latency(time.monotonic() - start)
+    return message
+
+if __name__ == "__main__":
+    # Report draft latency with a simulated slow model:
+    #   python ai_service.py [model_delay_seconds] [runs]
+    import sys
+    from types import SimpleNamespace
+    
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else AI_TIMEOUT_SECONDS * 2
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    
+    class SlowModel:
+        def generate_content(self, prompt):
+            time.sleep(delay)
+            return SimpleNamespace(text="Hey Alex! How have you been?")
+    
+    model = SlowModel()
+    contact = {
+        "name": "Alex Example",
+        "birthday": "1990-01-01",
+        "notes": "new job",
+        "last_contact_date": None,
+        "contact_group": "friends"
+    }
+    
+    print(f"Drafting {runs} messages with a simulated model delay of {delay}s")
+    for _ in range(runs):
+        draft_message(contact)
+    print(draft_local_message(contact))
+    print(get_draft_stats())
+    executor.shutdown(wait=False, cancel_futures=True)
@@ -7,10 +7,11 @@ from typing import Optional, Union
 # Import our modules
 from database import (
     init_db, get_all_contacts, get_contact_by_id, create_contact, 
-    update_contact, delete_contact, log_contact, check_duplicate_name
+    update_contact, delete_contact, log_contact, check_duplicate_name,
+    get_database_stats, run_maintenance
 )
 from models import ContactCreate, ContactUpdate, ContactLog
-from ai_service import draft_message
+from ai_service import draft_message, get_draft_stats
 from email_service import send_email, check_daily_reminders
 
 app = FastAPI(title="StayInTouch API")
@@ -191,8 +192,26 @@ async def send_reminders_now():
     check_daily_reminders()
     return {"message": "Reminder check completed"}
 
+@app.get("/database/stats")
+async def database_stats():
+    """Get database and log archive sizes"""
+    return get_database_stats()
+
+@app.post("/database/maintenance")
+async def database_maintenance():
+    """Manually archive old contact logs and compact the database"""
+    stats = run_maintenance()
+    return {"message": "Database maintenance completed", **stats}
+
+@app.get("/draft-message/stats")
+async def draft_message_stats():
+    """Get AI drafting latency and circuit breaker state"""
+    return get_draft_stats()
+
+# Plain def so FastAPI runs it in its threadpool and waiting on Gemini
+# does not block the event loop
 @app.post("/draft-message/{contact_id}")
-async def draft_message_endpoint(contact_id: int, custom_prompt: str = ""):
+def draft_message_endpoint(contact_id: int, custom_prompt: str = ""):
     """Draft a personalized message for a contact"""
     try:
         # Get contact information
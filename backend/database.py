@@ -1,5 +1,6 @@
 import sqlite3
 import os
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -7,9 +8,19 @@ load_dotenv()
 
 DATABASE = "contacts.db"
 
+# Log archival configuration
+ARCHIVE_DATABASE = os.getenv('ARCHIVE_DATABASE', 'contacts_archive.db')
+LOG_ARCHIVE_DAYS = int(os.getenv('LOG_ARCHIVE_DAYS', 365))
+
+def get_connection():
+    """Open a database connection with foreign key enforcement enabled"""
+    conn = sqlite3.connect(DATABASE)
+    conn.execute('PRAGMA foreign_keys = ON')
+    return conn
+
 def init_db():
     """Initialize the database with required tables"""
-    conn = sqlite3.connect(DATABASE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Create contacts table
@@ -42,16 +53,79 @@ def init_db():
             contact_date TEXT NOT NULL,
             method TEXT DEFAULT 'whatsapp',
             notes TEXT,
-            FOREIGN KEY (contact_id) REFERENCES contacts (id)
+            FOREIGN KEY (contact_id) REFERENCES contacts (id) ON DELETE CASCADE
         )
     ''')
     
+    # Rebuild contact_logs if it was created without ON DELETE CASCADE
+    # (for existing databases), dropping logs of already deleted contacts.
+    # A leftover contact_logs_old means an earlier rebuild was interrupted,
+    # so its rows are recovered the same way.
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'contact_logs_old'")
+    has_old_logs = cursor.fetchone()[0] > 0
+    cursor.execute('PRAGMA foreign_key_list(contact_logs)')
+    needs_cascade = any(fk[6] != 'CASCADE' for fk in cursor.fetchall())
+    
+    rebuilt = False
+    if needs_cascade or has_old_logs:
+        # Run the rebuild as one explicit transaction; sqlite3 would otherwise
+        # commit the schema changes one statement at a time
+        conn.commit()
+        conn.isolation_level = None
+        cursor.execute('PRAGMA foreign_keys = OFF')
+        cursor.execute('BEGIN')
+        try:
+            if needs_cascade:
+                if has_old_logs:
+                    cursor.execute('INSERT OR IGNORE INTO contact_logs_old SELECT * FROM contact_logs')
+                    cursor.execute('DROP TABLE contact_logs')
+                else:
+                    cursor.execute('ALTER TABLE contact_logs RENAME TO contact_logs_old')
+                cursor.execute('''
+                    CREATE TABLE contact_logs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        contact_id INTEGER,
+                        contact_date TEXT NOT NULL,
+                        method TEXT DEFAULT 'whatsapp',
+                        notes TEXT,
+                        FOREIGN KEY (contact_id) REFERENCES contacts (id) ON DELETE CASCADE
+                    )
+                ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO contact_logs (id, contact_id, contact_date, method, notes)
+                SELECT id, contact_id, contact_date, method, notes FROM contact_logs_old
+                WHERE contact_id IN (SELECT id FROM contacts)
+            ''')
+            cursor.execute('DROP TABLE contact_logs_old')
+            cursor.execute('COMMIT')
+        except sqlite3.Error:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            cursor.execute('PRAGMA foreign_keys = ON')
+            conn.isolation_level = ''
+        rebuilt = True
+    
+    # Indexes for cascading deletes and archival scans
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_contact_logs_contact_id ON contact_logs (contact_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_contact_logs_contact_date ON contact_logs (contact_date)')
     conn.commit()
+    
+    # Switch to incremental auto-vacuum so freed pages can be reclaimed later.
+    # Changing the mode on an existing database only takes effect after a VACUUM,
+    # which runs after the rebuild so its freed pages are reclaimed as well.
+    cursor.execute('PRAGMA auto_vacuum')
+    if cursor.fetchone()[0] != 2:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+    elif rebuilt:
+        cursor.executescript('PRAGMA incremental_vacuum;')
+    
     conn.close()
 
 def get_all_contacts():
     """Get all contacts from database"""
-    conn = sqlite3.connect(DATABASE)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM contacts')
     rows = cursor.fetchall()
@@ -76,7 +150,7 @@ def get_all_contacts():
 
 def get_contact_by_id(contact_id):
     """Get a specific contact by ID"""
-    conn = sqlite3.connect(DATABASE)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM contacts WHERE id = ?', (contact_id,))
     row = cursor.fetchone()
@@ -100,7 +174,7 @@ def get_contact_by_id(contact_id):
 
 def create_contact(contact_data):
     """Create a new contact"""
-    conn = sqlite3.connect(DATABASE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -124,7 +198,7 @@ def create_contact(contact_data):
 
 def update_contact(contact_id, contact_data):
     """Update an existing contact"""
-    conn = sqlite3.connect(DATABASE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -147,10 +221,15 @@ def update_contact(contact_id, contact_data):
     conn.close()
 
 def delete_contact(contact_id):
-    """Delete a contact"""
-    conn = sqlite3.connect(DATABASE)
+    """Delete a contact (its logs are removed by ON DELETE CASCADE)"""
+    conn = get_connection()
     cursor = conn.cursor()
     
+    # Archived logs live in a separate file the cascade cannot reach
+    if os.path.exists(ARCHIVE_DATABASE):
+        cursor.execute('ATTACH DATABASE ? AS archive', (ARCHIVE_DATABASE,))
+        cursor.execute('DELETE FROM archive.contact_logs WHERE contact_id = ?', (contact_id,))
+    
     cursor.execute('DELETE FROM contacts WHERE id = ?', (contact_id,))
     
     conn.commit()
@@ -158,7 +237,7 @@ def delete_contact(contact_id):
 
 def log_contact(contact_id, contact_date, method='whatsapp', notes=None):
     """Log a contact interaction"""
-    conn = sqlite3.connect(DATABASE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Insert into contact_logs
@@ -179,7 +258,7 @@ def log_contact(contact_id, contact_date, method='whatsapp', notes=None):
 
 def check_duplicate_name(name, exclude_id=None):
     """Check if a contact name already exists (case-insensitive)"""
-    conn = sqlite3.connect(DATABASE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     if exclude_id:
@@ -191,3 +270,130 @@ def check_duplicate_name(name, exclude_id=None):
     conn.close()
     
     return count > 0
+
+def purge_orphan_logs():
+    """Remove contact logs whose contact no longer exists"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('DELETE FROM contact_logs WHERE contact_id NOT IN (SELECT id FROM contacts)')
+    removed = cursor.rowcount
+    
+    conn.commit()
+    conn.close()
+    
+    return removed
+
+def archive_old_logs(days=LOG_ARCHIVE_DAYS):
+    """Move contact logs older than the given number of days into the archive database"""
+    cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('ATTACH DATABASE ? AS archive', (ARCHIVE_DATABASE,))
+    
+    # Use incremental auto-vacuum for the archive too, so it can be compacted
+    cursor.execute('PRAGMA archive.auto_vacuum')
+    if cursor.fetchone()[0] != 2:
+        cursor.execute('PRAGMA archive.auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM archive')
+    
+    # The archive has its own key; log_id keeps the original contact_logs id,
+    # which is not guaranteed to stay unique if contacts.db is recreated
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archive.contact_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            log_id INTEGER,
+            contact_id INTEGER,
+            contact_date TEXT NOT NULL,
+            method TEXT,
+            notes TEXT,
+            archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_contact_logs_contact_id ON contact_logs (contact_id)')
+    
+    # Copy and delete in the same transaction so no log is lost or duplicated
+    cursor.execute('''
+        INSERT INTO archive.contact_logs (log_id, contact_id, contact_date, method, notes)
+        SELECT id, contact_id, contact_date, method, notes FROM main.contact_logs
+        WHERE contact_date < ?
+    ''', (cutoff,))
+    cursor.execute('DELETE FROM main.contact_logs WHERE contact_date < ?', (cutoff,))
+    archived = cursor.rowcount
+    
+    conn.commit()
+    cursor.execute('DETACH DATABASE archive')
+    conn.close()
+    
+    return archived
+
+def compact_database(max_pages=0):
+    """Return free pages of the database and the archive to the filesystem (0 frees all of them)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # executescript steps the pragma to completion; a plain execute
+    # only frees a single page. PRAGMA arguments cannot be bound.
+    cursor.executescript(f'PRAGMA incremental_vacuum({int(max_pages)});')
+    
+    if os.path.exists(ARCHIVE_DATABASE):
+        cursor.execute('ATTACH DATABASE ? AS archive', (ARCHIVE_DATABASE,))
+        cursor.executescript(f'PRAGMA archive.incremental_vacuum({int(max_pages)});')
+        cursor.execute('DETACH DATABASE archive')
+    
+    conn.close()
+
+def get_database_stats():
+    """Get size information for the database and the log archive"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('PRAGMA page_size')
+    page_size = cursor.fetchone()[0]
+    cursor.execute('PRAGMA page_count')
+    page_count = cursor.fetchone()[0]
+    cursor.execute('PRAGMA freelist_count')
+    freelist_count = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(*) FROM contact_logs')
+    log_count = cursor.fetchone()[0]
+    conn.close()
+    
+    archived_log_count = 0
+    archive_size_bytes = 0
+    if os.path.exists(ARCHIVE_DATABASE):
+        archive_size_bytes = os.path.getsize(ARCHIVE_DATABASE)
+        conn = sqlite3.connect(ARCHIVE_DATABASE)
+        try:
+            archived_log_count = conn.execute('SELECT COUNT(*) FROM contact_logs').fetchone()[0]
+        except sqlite3.OperationalError:
+            # Archive exists but nothing has been archived yet
+            pass
+        conn.close()
+    
+    return {
+        "database_size_bytes": page_size * page_count,
+        "free_bytes": page_size * freelist_count,
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_count": freelist_count,
+        "log_count": log_count,
+        "archived_log_count": archived_log_count,
+        "archive_size_bytes": archive_size_bytes
+    }
+
+def run_maintenance(days=LOG_ARCHIVE_DAYS):
+    """Purge orphan logs, archive old logs and compact the database"""
+    size_before = get_database_stats()["database_size_bytes"]
+    
+    orphans_removed = purge_orphan_logs()
+    logs_archived = archive_old_logs(days)
+    compact_database()
+    
+    stats = get_database_stats()
+    stats.update({
+        "orphans_removed": orphans_removed,
+        "logs_archived": logs_archived,
+        "size_before_bytes": size_before
+    })
+    return stats
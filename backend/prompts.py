@@ -21,4 +21,19 @@ Please draft a warm, friendly, and personal message that:
 {custom_prompt}
 
 Draft the message now:
-"""
\ No newline at end of file
+"""
+
+# Local fallback templates, used when Gemini is slow or unavailable
+
+FALLBACK_GREETINGS = {
+    "family": "Hi {name}!",
+    "work": "Hi {name},",
+    "friends": "Hey {name}!"
+}
+
+FALLBACK_BIRTHDAY_TODAY = "Happy birthday! 🎂 I hope you're having a wonderful day."
+FALLBACK_BIRTHDAY_BELATED = "Happy belated birthday! 🎂 I hope you had a wonderful day."
+FALLBACK_BIRTHDAY_UPCOMING = "Your birthday is coming up soon, any plans?"
+FALLBACK_LONG_TIME = "It's been a while since we last talked and I was just thinking of you."
+FALLBACK_CHECK_IN = "I was just thinking of you and wanted to check in."
+FALLBACK_CLOSING = "Would love to catch up soon!"
@@ -4,16 +4,17 @@ Standalone StayInTouch utility script
 This can be run independently of the FastAPI server
 
 Usage:
-    python send_reminders.py [init|reminders|test-email]
+    python send_reminders.py [init|reminders|test-email|maintenance]
     
     init         - Initialize database only
     reminders    - Send email reminders (default)
     test-email   - Send a test email
+    maintenance  - Archive old contact logs and compact the database
 """
 
 import sys
 import os
-from database import init_db
+from database import init_db, run_maintenance, LOG_ARCHIVE_DAYS
 from email_service import check_daily_reminders, send_email
 
 def init_database():
@@ -61,6 +62,23 @@ def test_email():
     else:
         print("✗ Failed to send test email")
 
+def maintenance():
+    """Archive old contact logs and compact the database"""
+    print("StayInTouch Database Maintenance")
+    print("=" * 40)
+    
+    # Initialize database if needed
+    print("Initializing database...")
+    init_db()
+    print("✓ Database ready")
+    
+    print(f"Archiving contact logs older than {LOG_ARCHIVE_DAYS} days...")
+    stats = run_maintenance()
+    print(f"✓ Removed {stats['orphans_removed']} orphaned logs")
+    print(f"✓ Archived {stats['logs_archived']} logs ({stats['archived_log_count']} in archive)")
+    print(f"✓ Database size: {stats['size_before_bytes']} -> {stats['database_size_bytes']} bytes")
+    print(f"  Archive size: {stats['archive_size_bytes']} bytes")
+
 def main():
     """Main function with command line argument support"""
     command = sys.argv[1] if len(sys.argv) > 1 else "reminders"
@@ -71,11 +89,14 @@ def main():
         send_reminders()
     elif command == "test-email":
         test_email()
+    elif command == "maintenance":
+        maintenance()
     else:
-        print("Usage: python send_reminders.py [init|reminders|test-email]")
+        print("Usage: python send_reminders.py [init|reminders|test-email|maintenance]")
         print("  init         - Initialize database only")
         print("  reminders    - Send email reminders (default)")
         print("  test-email   - Send a test email")
+        print("  maintenance  - Archive old contact logs and compact the database")
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -16,12 +16,13 @@ cd "$BACKEND_DIR"
 # Activate virtual environment
 source StayInTouch_venv/bin/activate
 
-# Initialize database and run the email check function
+# Initialize database, run the email check function and database maintenance
 python -c "
 import sys
 sys.path.append('.')
-from database import init_db
+from database import init_db, run_maintenance
 from email_service import check_daily_reminders
 init_db()  # Initialize database if it doesn't exist
 check_daily_reminders()
+print(run_maintenance())  # Archive old logs and reclaim free pages
 "